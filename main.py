@@ -1,6 +1,8 @@
 import asyncio
 import logging
+import logging.handlers
 import os
+import queue
 from dotenv import load_dotenv
 
 from livekit.agents import (
@@ -15,13 +17,29 @@ from livekit.agents import (
 from livekit.plugins import openai
 
 from src.agents.rental_agent import RentalAgent
-from health_server import start_health_server
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Use uvloop for lower event-loop overhead when available (Linux/macOS)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# Configure logging: records are handed to a queue and written by a
+# background listener thread, so log I/O never blocks the event loop
 logging.basicConfig(level=logging.INFO)
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_root_logger = logging.getLogger()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *_root_logger.handlers, respect_handler_level=True
+)
+_root_logger.handlers = [logging.handlers.QueueHandler(_log_queue)]
+_log_listener.start()
+
 logger = logging.getLogger("rental-agent")
 
 
@@ -51,7 +69,12 @@ async def entrypoint(ctx: JobContext):
     
     # Initialize rental agent state
     rental_agent = RentalAgent()
-    
+
+    # Warm the connection pool and inventory cache while the LiveKit
+    # handshake is in flight so the first tool call doesn't pay the
+    # cold-start cost
+    warmup = asyncio.create_task(rental_agent.data_service.warmup())
+
     # Connect to room
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
     logger.info("Connected to room")
@@ -71,6 +94,7 @@ async def entrypoint(ctx: JobContext):
             rental_agent.accept_price,
             rental_agent.verify_operator_credentials,
             rental_agent.verify_insurance_coverage,
+            rental_agent.verify_customer_details,
             rental_agent.complete_booking,
             rental_agent.end_call,
         ],
@@ -86,7 +110,14 @@ async def entrypoint(ctx: JobContext):
     rental_agent.set_agent(agent)
     
     logger.info("Agent configured, creating session...")
-    
+
+    # Make sure the prefetch finished (it usually has, hidden behind the
+    # connection handshake) before the session starts taking tool calls
+    try:
+        await warmup
+    except Exception as e:
+        logger.warning(f"Inventory prefetch failed: {e}")
+
     # Create and start AgentSession (uses Agent's configuration)
     session = AgentSession()
     
@@ -99,13 +130,13 @@ if __name__ == "__main__":
     # Validate environment before starting
     validate_environment()
 
-    # Start health check server
-    start_health_server(port=int(os.getenv("HEALTH_PORT", "8080")))
-
+    # Health checks are served by the worker's built-in HTTP server on the
+    # same event loop - no separate thread/loop needed
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             agent_name="rental-agent",
+            port=int(os.getenv("HEALTH_PORT", "8080")),
         )
     )
 
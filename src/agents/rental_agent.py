@@ -1,10 +1,13 @@
+import asyncio
+import hashlib
 import logging
+
 from livekit.agents import llm
 
-from ..services.postgres_service import PostgresDataService
+from ..services.postgres_service import get_pg_service
 from ..services.verification_service import VerificationService
 from ..utils.conversation_state import ConversationState, WorkflowStage
-from ..utils.prompts import get_system_prompt
+from ..utils.prompts import get_static_system_prompt, get_dynamic_context
 from ..utils.function_tools import format_equipment_for_context
 from ..utils.validators import (
     ValidationError,
@@ -26,19 +29,25 @@ class RentalAgent:
     """Main voice agent for equipment rental system."""
 
     def __init__(self):
-        self.data_service = PostgresDataService()
+        self.data_service = get_pg_service()
         self.verification_service = VerificationService()
         self.state = ConversationState()
         self.agent = None
+        # (inventory version, formatted search response) from the last search
+        self._search_cache = None
+        self._update_task = None
+        self._update_dirty = False
+        self._last_ctx_hash = None
+        self._booking_lock = asyncio.Lock()
+        self._booking_message = None
         
     def set_agent(self, agent):
         """Store reference to the Agent instance."""
         self.agent = agent
     
     def get_current_instructions(self) -> str:
-        """Get current stage instructions."""
-        context = self._get_stage_context()
-        return get_system_prompt(self.state.stage, context)
+        """Get the static system prompt (stage context is injected separately)."""
+        return get_static_system_prompt()
     
     def _get_stage_context(self) -> dict:
         """Get context data for current stage."""
@@ -70,16 +79,63 @@ class RentalAgent:
         return context
     
     async def _update_instructions(self):
-        """Update agent instructions for new stage."""
+        """Inject stage context for the new stage as a separate message.
+
+        The system prompt itself stays static so the Realtime API's
+        prompt-prefix cache survives stage transitions.
+        """
         if not self.agent:
             return
-        
-        new_instructions = self.get_current_instructions()
-        
-        # Update agent instructions using the update_instructions method
-        await self.agent.update_instructions(new_instructions)
-        
-        logger.info(f"Updated instructions for stage: {self.state.stage.value}")
+
+        stage_message = get_dynamic_context(self.state.stage, self._get_stage_context())
+
+        # get_dynamic_context is deterministic (sorted keys), so an
+        # unchanged hash means the stage context is byte-identical -
+        # skip the round-trip rather than spuriously growing the prefix
+        ctx_hash = hashlib.blake2b(stage_message.encode(), digest_size=8).digest()
+        if ctx_hash == self._last_ctx_hash:
+            return
+        self._last_ctx_hash = ctx_hash
+
+        chat_ctx = self.agent.chat_ctx.copy()
+        chat_ctx.add_message(role="system", content=stage_message)
+        await self.agent.update_chat_ctx(chat_ctx)
+
+        logger.info("Injected stage context for stage: %s", self.state.stage.name)
+
+    def _schedule_instructions_update(self):
+        """Coalesce stage-context updates into one refresh per turn.
+
+        When the LLM chains several tool calls in a single turn, each may
+        advance the stage; scheduling (instead of awaiting) means only one
+        update runs, and it reads the final stage state.
+        """
+        # Tool calls run as separate tasks, so a stage advance can land
+        # while a previous update is mid-flight; the flag makes the
+        # running task re-render instead of the advance being dropped
+        self._update_dirty = True
+        if self._update_task is None or self._update_task.done():
+            self._update_task = asyncio.create_task(self._run_instructions_update())
+
+    async def _run_instructions_update(self):
+        # Yield once so any remaining tool calls in this turn settle first
+        await asyncio.sleep(0)
+        # Drain the dirty flag: a stage advance that arrives while
+        # update_chat_ctx is awaited re-runs the render, so the context
+        # message for the final stage always gets sent
+        while self._update_dirty:
+            self._update_dirty = False
+            await self._update_instructions()
+
+    async def _settle_pending_update(self):
+        """Wait for a previously scheduled context refresh to finish.
+
+        Called at the top of stage-sensitive tools so context messages
+        always land in the conversation before the next tool acts.
+        """
+        task = self._update_task
+        if task is not None and not task.done():
+            await task
     
     # Tool functions with @llm.function_tool decorator
     
@@ -92,13 +148,15 @@ class RentalAgent:
             license_number: The business license number provided by the customer
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_license_number(license_number)
         except ValidationError as e:
-            logger.warning(f"License validation failed: {e}")
+            logger.warning("License validation failed: %s", e)
             return f"Invalid license number format: {str(e)}"
 
-        logger.info(f"Verifying business license: {license_number}")
+        logger.info("Verifying business license: %s", license_number)
 
         success, message = await self.verification_service.verify_business_license(license_number)
         
@@ -108,7 +166,7 @@ class RentalAgent:
             self.state.business_name = "Verified Business Customer"
             self.state.advance_stage()
             
-            await self._update_instructions()
+            self._schedule_instructions_update()
             
             return f"Business license verified. Customer: {self.state.business_name}"
         else:
@@ -124,12 +182,25 @@ class RentalAgent:
             search_query: Natural language search query from customer (e.g., 'excavator for foundation work', 'forklift under $400')
         """
         
-        logger.info(f"Searching equipment: {search_query}")
-        
+        logger.info("Searching equipment: %s", search_query)
+
+        # The response only depends on inventory contents, so reuse the
+        # formatted result until the data service's inventory version
+        # changes (getattr keeps services without one working, uncached)
+        version = getattr(self.data_service, 'version', None)
+        if version is not None and self._search_cache and self._search_cache[0] == version:
+            return self._search_cache[1]
+
         available_equipment = await self.data_service.get_available_equipment()
         formatted = format_equipment_for_context(available_equipment)
-        
-        return f"Found {len(available_equipment)} available equipment:\n\n{formatted}"
+
+        result = f"Found {len(available_equipment)} available equipment:\n\n{formatted}"
+
+        version = getattr(self.data_service, 'version', None)
+        if version is not None:
+            self._search_cache = (version, result)
+
+        return result
     
     @llm.function_tool()
     async def select_equipment(self, equipment_id: str):
@@ -140,13 +211,15 @@ class RentalAgent:
             equipment_id: The equipment ID (e.g., EQ001)
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_equipment_id(equipment_id)
         except ValidationError as e:
-            logger.warning(f"Equipment ID validation failed: {e}")
+            logger.warning("Equipment ID validation failed: %s", e)
             return f"Invalid equipment ID format: {str(e)}"
 
-        logger.info(f"Selecting equipment: {equipment_id}")
+        logger.info("Selecting equipment: %s", equipment_id)
 
         equipment = await self.data_service.get_equipment_by_id(equipment_id)
         
@@ -160,7 +233,7 @@ class RentalAgent:
         self.state.equipment_id = equipment_id
         self.state.advance_stage()
         
-        await self._update_instructions()
+        self._schedule_instructions_update()
         
         return f"Selected: {equipment['Equipment Name']} at ${equipment['Daily Rate']}/day. Location: {equipment['Storage Location']}"
     
@@ -173,13 +246,15 @@ class RentalAgent:
             job_address: The job site address provided by customer
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_address(job_address)
         except ValidationError as e:
-            logger.warning(f"Address validation failed: {e}")
+            logger.warning("Address validation failed: %s", e)
             return f"Invalid address format: {str(e)}"
 
-        logger.info(f"Verifying site safety: {job_address}")
+        logger.info("Verifying site safety: %s", job_address)
 
         if not self.state.selected_equipment:
             return "No equipment selected yet."
@@ -197,7 +272,7 @@ class RentalAgent:
             self.state.site_verified = True
             self.state.advance_stage()
             
-            await self._update_instructions()
+            self._schedule_instructions_update()
             
             return f"Site verified for {equipment['Weight Class']} equipment at {job_address}."
         else:
@@ -214,21 +289,25 @@ class RentalAgent:
             rental_days: Number of days for rental (default: 1)
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_price(proposed_daily_rate)
             validate_rental_days(rental_days)
         except ValidationError as e:
-            logger.warning(f"Price/duration validation failed: {e}")
+            logger.warning("Price/duration validation failed: %s", e)
             return f"Invalid pricing information: {str(e)}"
 
-        logger.info(f"Price proposal: ${proposed_daily_rate}/day for {rental_days} days")
+        logger.info("Price proposal: $%s/day for %s days", proposed_daily_rate, rental_days)
 
         if not self.state.selected_equipment:
             return "No equipment selected."
         
         equipment = self.state.selected_equipment
-        min_rate = float(equipment['Daily Rate'])
-        max_rate = float(equipment['Max Rate'])
+        # Rate columns arrive numeric from the data service (float from
+        # CSV, Decimal from Postgres) - both compare and format fine here
+        min_rate = equipment['Daily Rate']
+        max_rate = equipment['Max Rate']
         
         self.state.negotiation_attempts += 1
         self.state.rental_days = rental_days
@@ -256,18 +335,20 @@ class RentalAgent:
             confirmed_daily_rate: The confirmed daily rental rate
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_price(confirmed_daily_rate)
         except ValidationError as e:
-            logger.warning(f"Price validation failed: {e}")
+            logger.warning("Price validation failed: %s", e)
             return f"Invalid price: {str(e)}"
 
-        logger.info(f"Price accepted: ${confirmed_daily_rate}/day")
+        logger.info("Price accepted: $%s/day", confirmed_daily_rate)
 
         self.state.agreed_daily_rate = confirmed_daily_rate
         self.state.advance_stage()
         
-        await self._update_instructions()
+        self._schedule_instructions_update()
         
         total = confirmed_daily_rate * (self.state.rental_days or 1)
         
@@ -284,15 +365,17 @@ class RentalAgent:
             operator_phone: Operator's contact phone number
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_operator_name(operator_name)
             validate_license_number(operator_license)
             validate_phone_number(operator_phone)
         except ValidationError as e:
-            logger.warning(f"Operator validation failed: {e}")
+            logger.warning("Operator validation failed: %s", e)
             return f"Invalid operator information: {str(e)}"
 
-        logger.info(f"Verifying operator: {operator_name}, license: {operator_license}")
+        logger.info("Verifying operator: %s, license: %s", operator_name, operator_license)
 
         if not self.state.selected_equipment:
             return "No equipment selected."
@@ -312,7 +395,7 @@ class RentalAgent:
             self.state.operator_verified = True
             self.state.advance_stage()
             
-            await self._update_instructions()
+            self._schedule_instructions_update()
             
             return f"Operator {operator_name} verified for {required_cert}. Phone: {operator_phone}"
         else:
@@ -328,20 +411,22 @@ class RentalAgent:
             policy_number: Insurance policy number
         """
 
+        await self._settle_pending_update()
+
         try:
             validate_policy_number(policy_number)
         except ValidationError as e:
-            logger.warning(f"Policy number validation failed: {e}")
+            logger.warning("Policy number validation failed: %s", e)
             return f"Invalid policy number: {str(e)}"
 
-        logger.info(f"Verifying insurance: {policy_number}")
+        logger.info("Verifying insurance: %s", policy_number)
 
         if not self.state.selected_equipment:
             return "No equipment selected."
         
         equipment = self.state.selected_equipment
         required_amount = equipment['Min Insurance']
-        equipment_value = str(int(float(equipment['Daily Rate']) * 100))
+        equipment_value = str(int(equipment['Daily Rate'] * 100))
         
         success, message = await self.verification_service.verify_insurance_coverage(
             policy_number,
@@ -354,38 +439,139 @@ class RentalAgent:
             self.state.insurance_verified = True
             self.state.advance_stage()
             
-            await self._update_instructions()
+            self._schedule_instructions_update()
             
             return f"Insurance policy {policy_number} verified with ${required_amount} coverage."
         else:
             self.state.end_call("failed_insurance_verification")
             return "Insurance coverage is insufficient. Cannot proceed with rental."
     
+    @llm.function_tool()
+    async def verify_customer_details(
+        self,
+        job_address: str,
+        operator_name: str,
+        operator_license: str,
+        operator_phone: str,
+        policy_number: str
+    ):
+        """
+        Verify site safety, operator credentials and insurance coverage in one step.
+        Use this fast path when the customer has provided all details at once;
+        the three independent verifications run concurrently.
+
+        Args:
+            job_address: The job site address provided by customer
+            operator_name: Name of the equipment operator
+            operator_license: Operator's license/certification number
+            operator_phone: Operator's contact phone number
+            policy_number: Insurance policy number
+        """
+
+        await self._settle_pending_update()
+
+        try:
+            validate_address(job_address)
+            validate_operator_name(operator_name)
+            validate_license_number(operator_license)
+            validate_phone_number(operator_phone)
+            validate_policy_number(policy_number)
+        except ValidationError as e:
+            logger.warning("Customer details validation failed: %s", e)
+            return f"Invalid customer details: {str(e)}"
+
+        logger.info("Verifying customer details in batch for operator: %s", operator_name)
+
+        if not self.state.selected_equipment:
+            return "No equipment selected."
+
+        equipment = self.state.selected_equipment
+        required_cert = equipment['Operator Cert Required']
+        required_amount = equipment['Min Insurance']
+        equipment_value = str(int(equipment['Daily Rate'] * 100))
+
+        # The three verifications are independent - fan them out so the
+        # tool waits one max-RTT instead of three serial round-trips
+        site_result, operator_result, insurance_result = await asyncio.gather(
+            self.verification_service.verify_site_safety(
+                job_address, equipment['Category'], equipment['Weight Class']
+            ),
+            self.verification_service.verify_operator_credentials(
+                operator_license, required_cert
+            ),
+            self.verification_service.verify_insurance_coverage(
+                policy_number, required_amount, equipment_value
+            ),
+        )
+
+        if not site_result[0]:
+            self.state.end_call("failed_site_verification")
+            return "Site does not meet safety requirements. Cannot proceed."
+
+        if not operator_result[0]:
+            self.state.end_call("failed_operator_verification")
+            return "Operator credentials could not be verified. Cannot proceed with rental."
+
+        if not insurance_result[0]:
+            self.state.end_call("failed_insurance_verification")
+            return "Insurance coverage is insufficient. Cannot proceed with rental."
+
+        self.state.job_address = job_address
+        self.state.site_verified = True
+        self.state.operator_name = operator_name
+        self.state.operator_license = operator_license
+        self.state.operator_phone = operator_phone
+        self.state.operator_verified = True
+        self.state.insurance_policy = policy_number
+        self.state.insurance_verified = True
+
+        # Advance through every stage whose requirements are now met
+        # (stops at pricing until a rate is agreed), with one context refresh
+        while self.state.advance_stage():
+            pass
+
+        self._schedule_instructions_update()
+
+        return (
+            f"All details verified: site at {job_address} approved for "
+            f"{equipment['Weight Class']} equipment, operator {operator_name} "
+            f"certified for {required_cert}, insurance policy {policy_number} "
+            f"confirmed with ${required_amount} coverage."
+        )
+
     @llm.function_tool()
     async def complete_booking(self):
         """Finalize the rental booking and update inventory."""
         
+        await self._settle_pending_update()
+
         logger.info("Completing booking...")
-        
+
         if not self.state.selected_equipment:
             return "No equipment selected."
-        
-        equipment_id = self.state.equipment_id
-        
-        # Atomic check-and-update
-        success = await self.data_service.update_equipment_status(equipment_id, "RENTED")
-        
-        if not success:
-            return f"Sorry, {self.state.selected_equipment['Equipment Name']} was just booked by another customer. Let me show you alternatives."
-        
-        # Booking successful
-        self.state.booking_confirmed = True
-        self.state.booking_reference = f"BK{equipment_id}-{self.state.business_license}"
-        
-        equipment = self.state.selected_equipment
-        total_cost = self.state.agreed_daily_rate * (self.state.rental_days or 1)
-        
-        return f"""Booking confirmed!
+
+        # Serialize the critical section so a duplicate invocation (e.g. an
+        # LLM retry) can't double-book; repeats get the cached confirmation
+        async with self._booking_lock:
+            if self.state.booking_confirmed:
+                return self._booking_message
+
+            equipment_id = self.state.equipment_id
+
+            # Atomic check-and-update
+            success = await self.data_service.update_equipment_status(equipment_id, "RENTED")
+
+            if not success:
+                return f"Sorry, {self.state.selected_equipment['Equipment Name']} was just booked by another customer. Let me show you alternatives."
+
+            # Booking successful
+            self.state.booking_confirmed = True
+            self.state.booking_reference = f"BK{equipment_id}-{self.state.business_license}"
+
+            equipment = self.state.selected_equipment
+            total_cost = self.state.agreed_daily_rate * (self.state.rental_days or 1)
+
+            self._booking_message = f"""Booking confirmed!
 
 Reference Number: {self.state.booking_reference}
 Equipment: {equipment['Equipment Name']} ({equipment_id})
@@ -396,7 +582,9 @@ Pickup Location: {equipment['Storage Location']}
 Operator Required: {equipment['Operator Cert Required']}
 
 You'll receive email confirmation shortly. Is there anything else I can help you with?"""
-    
+
+            return self._booking_message
+
     @llm.function_tool()
     async def end_call(self, reason: str = "completed"):
         """
@@ -406,7 +594,7 @@ You'll receive email confirmation shortly. Is there anything else I can help you
             reason: Reason for ending the call (e.g., 'completed', 'failed_verification', 'no_equipment')
         """
         
-        logger.info(f"Ending call: {reason}")
+        logger.info("Ending call: %s", reason)
 
         self.state.end_call(reason)
 
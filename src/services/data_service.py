@@ -1,78 +1,140 @@
 import csv
 import asyncio
 import aiofiles
+from io import StringIO
 from typing import List, Dict, Optional
 from pathlib import Path
 
+from ..utils.function_tools import format_equipment_for_context, format_equipment_row
+
 
 class EquipmentDataService:
     """Handles reading and writing equipment inventory data."""
-    
+
     def __init__(self, csv_path: str = "data/equipment_inventory.csv"):
         self.csv_path = Path(csv_path)
         self._lock = asyncio.Lock()
-    
+        self._cache: Optional[List[Dict]] = None
+        self._by_id: Dict[str, Dict] = {}
+        self._available: set = set()
+        self._version: int = 0
+        self._formatted: Optional[str] = None
+        self._formatted_version: int = -1
+        self._flush_task: Optional[asyncio.Task] = None
+        self._fieldnames: List[str] = []
+
+    @property
+    def version(self) -> int:
+        """Monotonic inventory version, bumped on every mutation."""
+        return self._version
+
+    async def _ensure_loaded(self):
+        """Load and parse the CSV once; subsequent calls serve from memory."""
+        if self._cache is not None:
+            return
+
+        async with self._lock:
+            # Another caller may have loaded while we waited on the lock
+            if self._cache is not None:
+                return
+
+            async with aiofiles.open(self.csv_path, mode='r', encoding='utf-8') as f:
+                content = await f.read()
+
+            lines = content.strip().split('\n')
+            reader = csv.DictReader(lines)
+            self._cache = list(reader)
+            self._fieldnames = list(reader.fieldnames or [])
+
+            # Normalize numeric columns once so hot paths (pricing,
+            # insurance) don't re-convert per call; malformed values fail
+            # loudly here rather than mid-negotiation
+            for row in self._cache:
+                row['Daily Rate'] = float(row['Daily Rate'])
+                row['Max Rate'] = float(row['Max Rate'])
+                row['_formatted'] = format_equipment_row(row)
+
+
+            self._by_id = {eq['Equipment ID']: eq for eq in self._cache}
+            self._available = {eq['Equipment ID'] for eq in self._cache if eq['Status'] == 'AVAILABLE'}
+            self._version += 1
+
     async def get_all_equipment(self) -> List[Dict]:
-        """Read all equipment from CSV."""
-        async with aiofiles.open(self.csv_path, mode='r', encoding='utf-8') as f:
-            content = await f.read()
-        
-        lines = content.strip().split('\n')
-        reader = csv.DictReader(lines)
-        return list(reader)
-    
+        """Get all equipment from the in-memory cache."""
+        await self._ensure_loaded()
+        return self._cache
+
     async def get_available_equipment(self) -> List[Dict]:
         """Get only available equipment."""
-        all_equipment = await self.get_all_equipment()
-        return [eq for eq in all_equipment if eq['Status'] == 'AVAILABLE']
-    
+        await self._ensure_loaded()
+        return [self._by_id[eid] for eid in sorted(self._available)]
+
     async def get_equipment_by_id(self, equipment_id: str) -> Optional[Dict]:
         """Get specific equipment by ID."""
-        all_equipment = await self.get_all_equipment()
-        for eq in all_equipment:
-            if eq['Equipment ID'] == equipment_id:
-                return eq
-        return None
-    
+        await self._ensure_loaded()
+        return self._by_id.get(equipment_id)
+
+    async def get_formatted_available(self) -> str:
+        """Get the available-equipment context block, cached per inventory version.
+
+        Unchanged inventories skip the formatting pass and return the
+        same string object, so repeat callers pay one dict lookup.
+        """
+        await self._ensure_loaded()
+
+        if self._formatted is None or self._formatted_version != self._version:
+            available = [self._by_id[eid] for eid in sorted(self._available)]
+            self._formatted = format_equipment_for_context(available)
+            self._formatted_version = self._version
+
+        return self._formatted
+
     async def update_equipment_status(self, equipment_id: str, new_status: str) -> bool:
         """
         Update equipment status with atomic check-and-update.
         Returns True if update successful, False if equipment already rented.
         """
+        await self._ensure_loaded()
+
         async with self._lock:
-            # Read current data
-            all_equipment = await self.get_all_equipment()
-            
-            # Find and check equipment
-            equipment_found = False
-            already_rented = False
-            
-            for eq in all_equipment:
-                if eq['Equipment ID'] == equipment_id:
-                    equipment_found = True
-                    if eq['Status'] != 'AVAILABLE':
-                        already_rented = True
-                        break
-                    # Update status
-                    eq['Status'] = new_status
-                    break
-            
-            if not equipment_found or already_rented:
+            equipment = self._by_id.get(equipment_id)
+
+            if equipment is None or equipment['Status'] != 'AVAILABLE':
                 return False
-            
-            # Write back to CSV using proper CSV writer
-            async with aiofiles.open(self.csv_path, mode='w', encoding='utf-8', newline='') as f:
-                if all_equipment:
-                    fieldnames = list(all_equipment[0].keys())
 
-                    # Use StringIO to write CSV properly with escaping
-                    from io import StringIO
-                    output = StringIO()
-                    writer = csv.DictWriter(output, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(all_equipment)
+            # Update the cached row and the status partition in place
+            equipment['Status'] = new_status
+            equipment['_formatted'] = format_equipment_row(equipment)
+            if new_status == 'AVAILABLE':
+                self._available.add(equipment_id)
+            else:
+                self._available.discard(equipment_id)
+            self._version += 1
+
+            if self._cache:
+                # Serialize now (cheap, in-memory) so the snapshot reflects
+                # this update even if another one lands before the flush runs.
+                # csv.writer over value lists skips DictWriter's per-row
+                # dict-to-list conversion; fieldnames are cached at load time.
+                output = StringIO()
+                writer = csv.writer(output)
+                writer.writerow(self._fieldnames)
+                writer.writerows([row[f] for f in self._fieldnames] for row in self._cache)
 
-                    await f.write(output.getvalue())
+                # Flush to disk off the booking critical path; chain onto any
+                # in-flight flush so writes reach the file in order
+                if self._flush_task is not None and not self._flush_task.done():
+                    await self._flush_task
+                self._flush_task = asyncio.create_task(self._flush_to_disk(output.getvalue()))
 
             return True
 
+    async def _flush_to_disk(self, payload: str):
+        """Write a serialized CSV snapshot back to disk."""
+        async with aiofiles.open(self.csv_path, mode='w', encoding='utf-8', newline='') as f:
+            await f.write(payload)
+
+    async def flush(self):
+        """Wait for any pending disk write to complete."""
+        if self._flush_task is not None:
+            await self._flush_task
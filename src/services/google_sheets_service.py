@@ -1,18 +1,50 @@
 import asyncio
 import os
 import logging
-from typing import List, Dict, Optional
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import aiohttp
 from google.oauth2 import service_account
 from google.auth.exceptions import DefaultCredentialsError
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from google.auth.transport.requests import Request as AuthRequest
 
 logger = logging.getLogger("rental-agent")
 
+# orjson encodes request bodies several times faster than stdlib json;
+# fall back quietly when it isn't installed
+try:
+    import orjson
+
+    def _json_serialize(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json
+
+    def _json_serialize(obj) -> str:
+        return json.dumps(obj)
+
+_SHEETS_BASE_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+
+# Quota exhaustion and transient server errors are worth retrying
+_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _col_to_a1(idx: int) -> str:
+    """Convert a 0-based column index to an A1 column reference (A, B, ..., AA)."""
+    out = []
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        out.append(chr(65 + rem))
+    return "".join(reversed(out))
+
 
 class GoogleSheetsDataService:
     """Handles reading and writing equipment inventory data from Google Sheets."""
-    
+
     def __init__(
         self,
         credentials_path: str = "credentials.json",
@@ -24,169 +56,296 @@ class GoogleSheetsDataService:
         self.spreadsheet_id = spreadsheet_id or os.getenv("GOOGLE_SHEET_ID")  # Match .env variable name
         # Use "Inventory" sheet by default, or from env
         self.range_name = range_name or os.getenv("GOOGLE_SHEETS_RANGE", "Inventory!A:J")
+        # Sheet name parsed once (e.g. "Inventory!A:J" -> "Inventory")
+        # instead of re-splitting per write
+        self._sheet_name = self.range_name.split('!', 1)[0] if '!' in self.range_name else 'Inventory'
         self.timeout = timeout  # API call timeout in seconds
         self._lock = asyncio.Lock()
-        self._service = None
-        
-    def _get_service(self):
-        """Get or create Google Sheets service."""
-        if self._service is None:
-            SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-            
-            # Try credentials file first, fall back to default credentials
-            try:
-                if os.path.exists(self.credentials_path):
-                    credentials = service_account.Credentials.from_service_account_file(
-                        self.credentials_path, scopes=SCOPES
-                    )
-                else:
-                    # Use default Cloud Run credentials
-                    from google.auth import default
-                    credentials, _ = default(scopes=SCOPES)
-            except (FileNotFoundError, DefaultCredentialsError, ValueError) as e:
-                logger.error(f"Error loading credentials: {e}")
-                raise
-                
-            self._service = build('sheets', 'v4', credentials=credentials)
-        return self._service
-    
-    async def get_all_equipment(self) -> List[Dict]:
-        """Read all equipment from Google Sheets."""
-        loop = asyncio.get_running_loop()
+        self._credentials = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        # TTL cache of parsed rows; a Sheets round-trip costs hundreds of ms
+        self._cache: Optional[List[Dict]] = None
+        self._index: Dict[str, Dict] = {}
+        self._cache_ts: float = 0.0
+        self._ttl: float = 30.0
+        # Sheet layout captured on read so updates can address rows directly
+        self._headers: List[str] = []
+        self._headers_index: Dict[str, int] = {}
+        self._row_by_id: Dict[str, int] = {}
+        # Status writes are debounced and flushed as one batchUpdate:
+        # equipment_id -> (new_status, sheet row, caller's future)
+        self._pending_writes: Dict[str, tuple] = {}
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_delay: float = 0.1
 
-        def _read_sheet():
-            try:
-                service = self._get_service()
-                sheet = service.spreadsheets()
-                result = sheet.values().get(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=self.range_name
-                ).execute()
+    def _load_credentials(self):
+        """Load service-account or default credentials."""
+        SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
-                values = result.get('values', [])
+        # Try credentials file first, fall back to default credentials
+        try:
+            if os.path.exists(self.credentials_path):
+                return service_account.Credentials.from_service_account_file(
+                    self.credentials_path, scopes=SCOPES
+                )
+            # Use default Cloud Run credentials
+            from google.auth import default
+            credentials, _ = default(scopes=SCOPES)
+            return credentials
+        except (FileNotFoundError, DefaultCredentialsError, ValueError) as e:
+            logger.error(f"Error loading credentials: {e}")
+            raise
 
-                if not values:
-                    return []
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled async HTTP session."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=_json_serialize,
+            )
+        return self._session
+
+    async def _auth_headers(self) -> Dict[str, str]:
+        """Get a valid bearer token, refreshing off-loop when expired."""
+        if self._credentials is None:
+            self._credentials = self._load_credentials()
 
-                # First row is headers
-                headers = values[0]
-                equipment_list = []
+        if not self._credentials.valid:
+            # Token refresh is a blocking HTTP call - keep it off the loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._credentials.refresh, AuthRequest())
 
-                # Convert rows to dictionaries
-                for row in values[1:]:
-                    # Pad row if it has fewer columns than headers
-                    while len(row) < len(headers):
-                        row.append('')
+        return {"Authorization": f"Bearer {self._credentials.token}"}
 
-                    equipment = dict(zip(headers, row))
-                    equipment_list.append(equipment)
+    async def _request_with_retry(self, method: str, url: str, max_attempts: int = 5, **kwargs):
+        """Issue an API request, retrying 429/5xx with backoff and jitter.
+
+        Honors a numeric Retry-After header when the API sends one.
+        Returns ``(status, payload)`` - the parsed JSON body on success,
+        the error text otherwise.
+        """
+        session = await self._get_session()
 
-                return equipment_list
+        for attempt in range(max_attempts):
+            async with session.request(method, url, headers=await self._auth_headers(), **kwargs) as resp:
+                if resp.status == 200:
+                    return resp.status, await resp.json()
 
-            except HttpError as error:
+                text = await resp.text()
+                if resp.status not in _RETRYABLE_STATUSES or attempt == max_attempts - 1:
+                    return resp.status, text
+
+                try:
+                    delay = min(60.0, float(resp.headers.get('Retry-After')))
+                except (TypeError, ValueError):
+                    delay = min(60.0, 2 ** attempt * 0.5 + random.random() * 0.5)
+
+            logger.warning("Google Sheets API returned %s, retrying in %.1fs", resp.status, delay)
+            await asyncio.sleep(delay)
+
+    async def warmup(self):
+        """Prime credentials, the HTTP session, and the row cache.
+
+        Doing the token refresh and first sheet read before real traffic
+        means the first caller skips the cold-start round-trips.
+        """
+        await self._get_session()
+        await self._auth_headers()
+        await self.get_all_equipment()
+
+    async def get_all_equipment(self) -> List[Dict]:
+        """Read all equipment from Google Sheets (cached for a short TTL)."""
+        if self._cache is not None and time.monotonic() - self._cache_ts < self._ttl:
+            return self._cache
+
+        # The lock keeps concurrent cache misses from stampeding the API
+        async with self._lock:
+            if self._cache is not None and time.monotonic() - self._cache_ts < self._ttl:
+                return self._cache
+
+            url = f"{_SHEETS_BASE_URL}/{self.spreadsheet_id}/values/{quote(self.range_name)}"
+
+            try:
+                status, result = await self._request_with_retry('GET', url)
+                if status != 200:
+                    logger.error(f"Google Sheets API error: {status} {result}")
+                    return []
+            except asyncio.TimeoutError:
+                logger.error(f"Google Sheets API call timed out after {self.timeout} seconds")
+                return []
+            except aiohttp.ClientError as error:
                 logger.error(f"Google Sheets API error: {error}")
                 return []
 
-        # Run in thread pool to avoid blocking with timeout
-        try:
-            return await asyncio.wait_for(
-                loop.run_in_executor(None, _read_sheet),
-                timeout=self.timeout
-            )
-        except asyncio.TimeoutError:
-            logger.error(f"Google Sheets API call timed out after {self.timeout} seconds")
-            return []
-    
+            values = result.get('values', [])
+
+            if not values:
+                return []
+
+            # First row is headers
+            headers = values[0]
+            equipment_list = []
+
+            # Remember layout so update_equipment_status can address
+            # the target cell without re-reading the sheet
+            self._headers = headers
+            self._headers_index = {name: i for i, name in enumerate(headers)}
+            id_col = self._headers_index.get('Equipment ID')
+            if id_col is not None:
+                self._row_by_id = {
+                    row[id_col]: i
+                    for i, row in enumerate(values[1:], start=2)  # 1-indexed, skip header
+                    if len(row) > id_col
+                }
+
+            # Convert rows to dictionaries
+            n_headers = len(headers)
+            for row in values[1:]:
+                # Pad short rows in one bulk extend rather than one
+                # append (and two len() calls) per missing column
+                n_missing = n_headers - len(row)
+                if n_missing > 0:
+                    row.extend([''] * n_missing)
+
+                equipment = dict(zip(headers, row))
+                equipment_list.append(equipment)
+
+            self._cache = equipment_list
+            self._index = {eq['Equipment ID']: eq for eq in equipment_list if eq.get('Equipment ID')}
+            self._cache_ts = time.monotonic()
+            return self._cache
+
+    def _invalidate_cache(self):
+        """Force the next read to refetch from the API."""
+        self._cache_ts = 0.0
+
     async def get_available_equipment(self) -> List[Dict]:
         """Get only available equipment."""
         all_equipment = await self.get_all_equipment()
         return [eq for eq in all_equipment if eq.get('Status') == 'AVAILABLE']
-    
+
     async def get_equipment_by_id(self, equipment_id: str) -> Optional[Dict]:
         """Get specific equipment by ID."""
-        all_equipment = await self.get_all_equipment()
-        for eq in all_equipment:
-            if eq.get('Equipment ID') == equipment_id:
-                return eq
-        return None
-    
+        await self.get_all_equipment()
+        return self._index.get(equipment_id)
+
+    async def get_equipment_by_ids(self, equipment_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Resolve several equipment IDs from a single sheet read.
+
+        Returns a mapping of ID to row (or None for unknown IDs).
+        """
+        await self.get_all_equipment()
+        return {eid: self._index.get(eid) for eid in equipment_ids}
+
     async def update_equipment_status(self, equipment_id: str, new_status: str) -> bool:
         """
         Update equipment status with atomic check-and-update.
         Returns True if update successful, False if equipment already rented.
+
+        Writes are debounced briefly and flushed together as a single
+        values:batchUpdate, so a burst of bookings costs one HTTPS
+        round-trip and one unit of the per-minute write quota instead of N.
         """
+        # Refresh the cache (and row index) outside the lock; the read is a
+        # no-op while the TTL cache is warm
+        await self.get_all_equipment()
+
         async with self._lock:
-            loop = asyncio.get_running_loop()
+            equipment = self._index.get(equipment_id)
+            equipment_row = self._row_by_id.get(equipment_id)
 
-            def _update_sheet():
-                try:
-                    # Read current data
-                    service = self._get_service()
-                    sheet = service.spreadsheets()
-                    
-                    result = sheet.values().get(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=self.range_name
-                    ).execute()
-                    
-                    values = result.get('values', [])
-                    
-                    if not values:
-                        return False
-                    
-                    headers = values[0]
-                    
-                    # Find the equipment and status column
-                    equipment_id_col = headers.index('Equipment ID')
-                    status_col = headers.index('Status')
-                    
-                    # Find the row with matching equipment ID
-                    equipment_row = None
-                    for i, row in enumerate(values[1:], start=2):  # Start at 2 (1-indexed, skip header)
-                        if len(row) > equipment_id_col and row[equipment_id_col] == equipment_id:
-                            equipment_row = i
-                            current_status = row[status_col] if len(row) > status_col else ''
-                            
-                            # Check if already rented
-                            if current_status != 'AVAILABLE':
-                                return False
-                            
-                            break
-                    
-                    if equipment_row is None:
-                        return False
-                    
-                    # Update the status
-                    # Convert column index to letter (A, B, C, etc.)
-                    status_col_letter = chr(65 + status_col)  # 65 is 'A'
-                    # Extract sheet name from range_name (e.g., "Inventory!A:J" -> "Inventory")
-                    sheet_name = self.range_name.split('!')[0] if '!' in self.range_name else 'Inventory'
-                    update_range = f"{sheet_name}!{status_col_letter}{equipment_row}"
-                    
-                    body = {
-                        'values': [[new_status]]
-                    }
-                    
-                    sheet.values().update(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=update_range,
-                        valueInputOption='RAW',
-                        body=body
-                    ).execute()
-                    
-                    return True
-
-                except HttpError as error:
-                    logger.error(f"Google Sheets API error during update: {error}")
-                    return False
-
-            # Run in thread pool with timeout
+            if equipment is None or equipment_row is None:
+                return False
+
+            # Check if already rented or claimed by a pending write
+            if equipment.get('Status') != 'AVAILABLE' or equipment_id in self._pending_writes:
+                return False
+
+            if 'Status' not in self._headers_index:
+                return False
+
+            # Claim the row in memory so concurrent bookings of the same
+            # item fail the availability check above
+            equipment['Status'] = new_status
+            future = asyncio.get_running_loop().create_future()
+            self._pending_writes[equipment_id] = (new_status, equipment_row, future)
+
+            if self._writer_task is None or self._writer_task.done():
+                self._writer_task = asyncio.create_task(self._drain_pending_writes())
+
+        return await future
+
+    async def _drain_pending_writes(self):
+        """Flush all queued status writes in one batchUpdate call."""
+        # Let a burst of bookings accumulate before flushing
+        await asyncio.sleep(self._write_delay)
+
+        async with self._lock:
+            pending = self._pending_writes
+            self._pending_writes = {}
+
+            # The finally block must run no matter what fails above it:
+            # an unresolved future here would hang its booking forever,
+            # so any unexpected error fails closed instead of killing
+            # the drain task with callers still waiting
+            ok = False
             try:
-                return await asyncio.wait_for(
-                    loop.run_in_executor(None, _update_sheet),
-                    timeout=self.timeout
-                )
+                status_col_letter = _col_to_a1(self._headers_index['Status'])
+
+                url = f"{_SHEETS_BASE_URL}/{self.spreadsheet_id}/values:batchUpdate"
+                body = {
+                    'valueInputOption': 'RAW',
+                    'data': [
+                        {
+                            'range': f"{self._sheet_name}!{status_col_letter}{row}",
+                            'values': [[status]]
+                        }
+                        for status, row, _ in pending.values()
+                    ]
+                }
+
+                status, result = await self._request_with_retry('POST', url, json=body)
+                if status != 200:
+                    logger.error(f"Google Sheets API error during update: {status} {result}")
+                else:
+                    ok = True
             except asyncio.TimeoutError:
                 logger.error(f"Google Sheets update timed out after {self.timeout} seconds")
-                return False
+            except aiohttp.ClientError as error:
+                logger.error(f"Google Sheets API error during update: {error}")
+            except Exception:
+                logger.exception("Unexpected error while flushing status writes")
+            finally:
+                if ok:
+                    self._invalidate_cache()
+                else:
+                    # Release the in-memory claims so the items stay bookable
+                    for equipment_id in pending:
+                        equipment = self._index.get(equipment_id)
+                        if equipment is not None:
+                            equipment['Status'] = 'AVAILABLE'
+
+                for _, _, future in pending.values():
+                    if not future.done():
+                        future.set_result(ok)
+
+    async def close(self):
+        """Close the HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Google Sheets HTTP session closed")
+
+
+# Shared instance: conversations reuse one HTTP session, credentials,
+# and TTL cache rather than re-creating them per call. Workers are
+# single-event-loop, so lazy init needs no lock.
+_service_singleton: Optional[GoogleSheetsDataService] = None
+
 
+def get_sheets_service() -> GoogleSheetsDataService:
+    """Get the process-wide GoogleSheetsDataService instance."""
+    global _service_singleton
+    if _service_singleton is None:
+        _service_singleton = GoogleSheetsDataService()
+    return _service_singleton
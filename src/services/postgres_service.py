@@ -3,11 +3,50 @@
 import asyncio
 import os
 import logging
+import time
 from typing import List, Dict, Optional
 import asyncpg
 
 logger = logging.getLogger("rental-agent")
 
+# SQL kept as module constants so every call sends byte-identical query
+# text; asyncpg's per-connection statement cache then reuses the prepared
+# plan instead of re-parsing and re-planning on each execution.
+_SELECT_COLUMNS = '''
+    equipment_id AS "Equipment ID",
+    equipment_name AS "Equipment Name",
+    category AS "Category",
+    daily_rate AS "Daily Rate",
+    max_rate AS "Max Rate",
+    status AS "Status",
+    operator_cert_required AS "Operator Cert Required",
+    min_insurance AS "Min Insurance",
+    storage_location AS "Storage Location",
+    weight_class AS "Weight Class"
+'''
+
+_SELECT_ALL_SQL = f'''
+    SELECT {_SELECT_COLUMNS}
+    FROM inventory
+    ORDER BY equipment_id
+'''
+
+_SELECT_BY_ID_SQL = f'''
+    SELECT {_SELECT_COLUMNS}
+    FROM inventory
+    WHERE equipment_id = $1
+'''
+
+_UPDATE_STATUS_SQL = '''
+    UPDATE inventory
+    SET status = $1, updated_at = CURRENT_TIMESTAMP
+    WHERE equipment_id = $2 AND status = 'AVAILABLE'
+    RETURNING equipment_id
+'''
+
+# Channel used for cross-instance cache invalidation
+_INVENTORY_CHANNEL = 'inventory_changed'
+
 
 class PostgresDataService:
     """Handles reading and writing inventory data from PostgreSQL."""
@@ -17,6 +56,20 @@ class PostgresDataService:
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
         self._pool = None
+        self._lock = asyncio.Lock()
+        # TTL cache of fetched rows; NOTIFY from any instance's write
+        # invalidates it well before the TTL expires
+        self._cache: Optional[List[asyncpg.Record]] = None
+        self._index: Dict[str, asyncpg.Record] = {}
+        self._cache_ts: float = 0.0
+        self._ttl: float = 30.0
+        self._version: int = 0
+        self._listener_conn = None
+
+    @property
+    def version(self) -> int:
+        """Monotonic inventory version; changes whenever cached rows may differ."""
+        return self._version
 
     async def _get_pool(self):
         """Get or create connection pool."""
@@ -56,83 +109,124 @@ class PostgresDataService:
                 )
             ''')
 
-            # Create index on status for fast availability queries
+            # Covering index on status: availability queries can be
+            # answered by an index-only scan with no heap fetches
             await conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_inventory_status
+                DROP INDEX IF EXISTS idx_inventory_status
+            ''')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_inventory_status_covering
                 ON inventory(status)
+                INCLUDE (equipment_id, equipment_name, category, daily_rate, max_rate,
+                         operator_cert_required, min_insurance, storage_location, weight_class)
+            ''')
+
+            # Notify listeners (this and other app instances) whenever
+            # inventory changes so in-memory caches invalidate immediately
+            await conn.execute(f'''
+                CREATE OR REPLACE FUNCTION notify_inventory_changed() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify('{_INVENTORY_CHANNEL}', NEW.equipment_id::text);
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql
+            ''')
+            await conn.execute('''
+                DROP TRIGGER IF EXISTS inventory_notify ON inventory
+            ''')
+            await conn.execute('''
+                CREATE TRIGGER inventory_notify
+                AFTER INSERT OR UPDATE ON inventory
+                FOR EACH ROW EXECUTE FUNCTION notify_inventory_changed()
             ''')
 
             logger.info("Database schema initialized")
 
-    async def get_all_equipment(self) -> List[Dict]:
-        """Read all equipment from database."""
-        pool = await self._get_pool()
+    def _on_inventory_changed(self, conn, pid, channel, payload):
+        """NOTIFY callback: drop the cache so the next read refetches."""
+        logger.debug("Inventory change notification for %s, invalidating cache", payload)
+        self._invalidate_cache()
 
-        async with pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT
-                    equipment_id AS "Equipment ID",
-                    equipment_name AS "Equipment Name",
-                    category AS "Category",
-                    daily_rate AS "Daily Rate",
-                    max_rate AS "Max Rate",
-                    status AS "Status",
-                    operator_cert_required AS "Operator Cert Required",
-                    min_insurance AS "Min Insurance",
-                    storage_location AS "Storage Location",
-                    weight_class AS "Weight Class"
-                FROM inventory
-                ORDER BY equipment_id
-            ''')
+    def _invalidate_cache(self):
+        """Force the next read to refetch from the database."""
+        self._cache_ts = 0.0
+        # Bump eagerly (not just on refetch) so version-keyed caches
+        # upstream stop serving results derived from the stale rows
+        self._version += 1
 
-            return [dict(row) for row in rows]
+    async def _ensure_listener(self):
+        """Hold a dedicated connection listening for inventory changes."""
+        if self._listener_conn is not None:
+            return
+        pool = await self._get_pool()
+        try:
+            self._listener_conn = await pool.acquire()
+            await self._listener_conn.add_listener(_INVENTORY_CHANNEL, self._on_inventory_changed)
+            logger.info("Listening for inventory change notifications")
+        except Exception as e:
+            # Cache falls back to TTL-only expiry without the listener
+            logger.warning(f"Could not start inventory listener: {e}")
 
-    async def get_available_equipment(self) -> List[Dict]:
-        """Get only available equipment."""
+    async def warmup(self):
+        """Open and exercise the pool before real traffic arrives.
+
+        Pings min_size connections in parallel and primes the inventory
+        cache so the first caller doesn't pay TCP+TLS+auth plus a cold
+        fetch.
+        """
         pool = await self._get_pool()
 
-        async with pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT
-                    equipment_id AS "Equipment ID",
-                    equipment_name AS "Equipment Name",
-                    category AS "Category",
-                    daily_rate AS "Daily Rate",
-                    max_rate AS "Max Rate",
-                    status AS "Status",
-                    operator_cert_required AS "Operator Cert Required",
-                    min_insurance AS "Min Insurance",
-                    storage_location AS "Storage Location",
-                    weight_class AS "Weight Class"
-                FROM inventory
-                WHERE status = 'AVAILABLE'
-                ORDER BY equipment_id
-            ''')
+        async def _ping():
+            async with pool.acquire() as conn:
+                await conn.execute('SELECT 1')
+
+        await asyncio.gather(*(_ping() for _ in range(pool.get_min_size())))
+        await self.get_all_equipment()
+
+    async def get_all_equipment(self) -> List[asyncpg.Record]:
+        """Read all equipment from database (cached for a short TTL).
+
+        Rows are returned as asyncpg Records rather than dicts: Records
+        already support ``row['Equipment ID']`` and ``row.get(...)``, so
+        converting every row would be ten allocations apiece for nothing.
+        Callers that need a real dict convert the single row they keep.
+        """
+        if self._cache is not None and time.monotonic() - self._cache_ts < self._ttl:
+            return self._cache
+
+        # The lock keeps concurrent cache misses from stampeding the pool
+        async with self._lock:
+            if self._cache is not None and time.monotonic() - self._cache_ts < self._ttl:
+                return self._cache
 
-            return [dict(row) for row in rows]
+            await self._ensure_listener()
+
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(_SELECT_ALL_SQL)
+
+            self._cache = rows
+            self._index = {row['Equipment ID']: row for row in rows}
+            self._cache_ts = time.monotonic()
+            # TTL refetches can bring back different rows without a prior
+            # invalidation, so every refetch is a new version
+            self._version += 1
+            return self._cache
+
+    async def get_available_equipment(self) -> List[asyncpg.Record]:
+        """Get only available equipment."""
+        all_equipment = await self.get_all_equipment()
+        return [eq for eq in all_equipment if eq['Status'] == 'AVAILABLE']
 
     async def get_equipment_by_id(self, equipment_id: str) -> Optional[Dict]:
-        """Get specific equipment by ID."""
-        pool = await self._get_pool()
+        """Get specific equipment by ID.
 
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                SELECT
-                    equipment_id AS "Equipment ID",
-                    equipment_name AS "Equipment Name",
-                    category AS "Category",
-                    daily_rate AS "Daily Rate",
-                    max_rate AS "Max Rate",
-                    status AS "Status",
-                    operator_cert_required AS "Operator Cert Required",
-                    min_insurance AS "Min Insurance",
-                    storage_location AS "Storage Location",
-                    weight_class AS "Weight Class"
-                FROM inventory
-                WHERE equipment_id = $1
-            ''', equipment_id)
-
-            return dict(row) if row else None
+        The single hit is converted to a dict here since callers hold on
+        to it (e.g. as selected equipment in conversation state).
+        """
+        await self.get_all_equipment()
+        row = self._index.get(equipment_id)
+        return dict(row) if row is not None else None
 
     async def update_equipment_status(self, equipment_id: str, new_status: str) -> bool:
         """
@@ -142,41 +236,43 @@ class PostgresDataService:
         pool = await self._get_pool()
 
         async with pool.acquire() as conn:
-            # Use a transaction for atomic check-and-update
-            async with conn.transaction():
-                # Check current status with row lock (FOR UPDATE)
-                current_status = await conn.fetchval('''
-                    SELECT status
-                    FROM inventory
-                    WHERE equipment_id = $1
-                    FOR UPDATE
-                ''', equipment_id)
-
-                if not current_status:
-                    logger.warning(f"Equipment {equipment_id} not found")
-                    return False
-
-                if current_status != 'AVAILABLE':
-                    logger.warning(f"Equipment {equipment_id} is {current_status}, not available")
-                    return False
-
-                # Update status
-                result = await conn.execute('''
-                    UPDATE inventory
-                    SET status = $1, updated_at = CURRENT_TIMESTAMP
-                    WHERE equipment_id = $2
-                ''', new_status, equipment_id)
-
-                # Check if update was successful
-                if result == "UPDATE 1":
-                    logger.info(f"Equipment {equipment_id} status updated to {new_status}")
-                    return True
-                else:
-                    logger.error(f"Failed to update equipment {equipment_id}")
-                    return False
+            # The status predicate makes the check-and-set atomic in one
+            # statement - no explicit transaction or FOR UPDATE row lock
+            # held across a round-trip
+            row = await conn.fetchrow(_UPDATE_STATUS_SQL, new_status, equipment_id)
+
+        if row is None:
+            logger.warning(f"Equipment {equipment_id} not found or not available")
+            return False
+
+        logger.info(f"Equipment {equipment_id} status updated to {new_status}")
+        # NOTIFY covers other instances; drop our copy directly
+        self._invalidate_cache()
+        return True
 
     async def close(self):
-        """Close connection pool."""
+        """Close the shared connection pool."""
+        if self._listener_conn is not None:
+            try:
+                await self._listener_conn.remove_listener(_INVENTORY_CHANNEL, self._on_inventory_changed)
+                await self._pool.release(self._listener_conn)
+            except Exception as e:
+                logger.warning(f"Error releasing listener connection: {e}")
+            self._listener_conn = None
         if self._pool:
             await self._pool.close()
             logger.info("PostgreSQL connection pool closed")
+
+
+# Shared instance: every conversation on this worker reuses one
+# connection pool (and one cache) instead of paying pool construction
+# per call. Workers are single-event-loop, so lazy init needs no lock.
+_service_singleton: Optional[PostgresDataService] = None
+
+
+def get_pg_service() -> PostgresDataService:
+    """Get the process-wide PostgresDataService instance."""
+    global _service_singleton
+    if _service_singleton is None:
+        _service_singleton = PostgresDataService()
+    return _service_singleton
@@ -1,24 +1,61 @@
-from enum import Enum
+from enum import IntEnum
 from typing import Optional, Dict
 from dataclasses import dataclass, field
 
 
-class WorkflowStage(Enum):
-    """Stages of the rental workflow."""
-    GREETING = "greeting"
-    CUSTOMER_VERIFICATION = "customer_verification"
-    EQUIPMENT_DISCOVERY = "equipment_discovery"
-    REQUIREMENTS_CONFIRMATION = "requirements_confirmation"
-    PRICING_NEGOTIATION = "pricing_negotiation"
-    OPERATOR_CERTIFICATION = "operator_certification"
-    INSURANCE_VERIFICATION = "insurance_verification"
-    BOOKING_COMPLETION = "booking_completion"
-    CALL_ENDED = "call_ended"
+class WorkflowStage(IntEnum):
+    """Stages of the rental workflow.
 
+    An IntEnum with contiguous values so stage-keyed tables can be plain
+    tuples indexed by the member itself; use ``stage.name`` (not the
+    numeric value) anywhere a human-readable label is needed.
+    """
+    GREETING = 0
+    CUSTOMER_VERIFICATION = 1
+    EQUIPMENT_DISCOVERY = 2
+    REQUIREMENTS_CONFIRMATION = 3
+    PRICING_NEGOTIATION = 4
+    OPERATOR_CERTIFICATION = 5
+    INSURANCE_VERIFICATION = 6
+    BOOKING_COMPLETION = 7
+    CALL_ENDED = 8
 
-@dataclass
+
+# Workflow progression, precomputed once so advance_stage is a dict lookup
+# instead of a per-call list build plus linear search
+_STAGE_ORDER = (
+    WorkflowStage.GREETING,
+    WorkflowStage.CUSTOMER_VERIFICATION,
+    WorkflowStage.EQUIPMENT_DISCOVERY,
+    WorkflowStage.REQUIREMENTS_CONFIRMATION,
+    WorkflowStage.PRICING_NEGOTIATION,
+    WorkflowStage.OPERATOR_CERTIFICATION,
+    WorkflowStage.INSURANCE_VERIFICATION,
+    WorkflowStage.BOOKING_COMPLETION,
+)
+_NEXT_STAGE = dict(zip(_STAGE_ORDER, _STAGE_ORDER[1:]))
+
+# Per-stage gate predicates: one dict lookup plus one call replaces the
+# old if/elif ladder walked on every user turn
+_STAGE_CHECK = {
+    WorkflowStage.GREETING: lambda s: True,
+    WorkflowStage.CUSTOMER_VERIFICATION: lambda s: s.customer_verified,
+    WorkflowStage.EQUIPMENT_DISCOVERY: lambda s: s.selected_equipment is not None,
+    WorkflowStage.REQUIREMENTS_CONFIRMATION: lambda s: s.site_verified,
+    WorkflowStage.PRICING_NEGOTIATION: lambda s: s.agreed_daily_rate is not None,
+    WorkflowStage.OPERATOR_CERTIFICATION: lambda s: s.operator_verified,
+    WorkflowStage.INSURANCE_VERIFICATION: lambda s: s.insurance_verified,
+}
+
+
+@dataclass(slots=True)
 class ConversationState:
-    """Tracks the state of the rental conversation."""
+    """Tracks the state of the rental conversation.
+
+    Slotted so each per-call instance skips the instance ``__dict__``:
+    roughly half the memory for ~20 fields and faster attribute access
+    on the hot stage-gating paths.
+    """
     
     # Current stage
     stage: WorkflowStage = WorkflowStage.GREETING
@@ -61,51 +98,17 @@ class ConversationState:
     
     def can_proceed_to_next_stage(self) -> bool:
         """Check if current stage requirements are met."""
-        if self.stage == WorkflowStage.GREETING:
-            return True
-        
-        elif self.stage == WorkflowStage.CUSTOMER_VERIFICATION:
-            return self.customer_verified
-        
-        elif self.stage == WorkflowStage.EQUIPMENT_DISCOVERY:
-            return self.selected_equipment is not None
-        
-        elif self.stage == WorkflowStage.REQUIREMENTS_CONFIRMATION:
-            return self.site_verified
-        
-        elif self.stage == WorkflowStage.PRICING_NEGOTIATION:
-            return self.agreed_daily_rate is not None
-        
-        elif self.stage == WorkflowStage.OPERATOR_CERTIFICATION:
-            return self.operator_verified
-        
-        elif self.stage == WorkflowStage.INSURANCE_VERIFICATION:
-            return self.insurance_verified
-        
-        return False
+        check = _STAGE_CHECK.get(self.stage)
+        return check(self) if check is not None else False
     
     def advance_stage(self) -> bool:
         """Move to next workflow stage if requirements are met."""
-        if not self.can_proceed_to_next_stage():
+        next_stage = _NEXT_STAGE.get(self.stage)
+        if next_stage is None or not self.can_proceed_to_next_stage():
             return False
-        
-        stage_order = [
-            WorkflowStage.GREETING,
-            WorkflowStage.CUSTOMER_VERIFICATION,
-            WorkflowStage.EQUIPMENT_DISCOVERY,
-            WorkflowStage.REQUIREMENTS_CONFIRMATION,
-            WorkflowStage.PRICING_NEGOTIATION,
-            WorkflowStage.OPERATOR_CERTIFICATION,
-            WorkflowStage.INSURANCE_VERIFICATION,
-            WorkflowStage.BOOKING_COMPLETION,
-        ]
-        
-        current_index = stage_order.index(self.stage)
-        if current_index < len(stage_order) - 1:
-            self.stage = stage_order[current_index + 1]
-            return True
-        
-        return False
+
+        self.stage = next_stage
+        return True
     
     def end_call(self, reason: str = "completed"):
         """Mark the call as ended."""
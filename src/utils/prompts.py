@@ -1,10 +1,12 @@
+import functools
+import json
+import string
+import sys
+
 from .conversation_state import WorkflowStage
 
 
-def get_system_prompt(stage: WorkflowStage, context: dict = None) -> str:
-    """Generate system prompt based on current workflow stage."""
-    
-    base_instructions = """You are a professional rental agent for Easy Inventory Rentals.
+base_instructions = """You are a professional rental agent for Easy Inventory Rentals.
 You handle inbound calls from businesses and customers who need inventory items.
 
 Your personality:
@@ -20,8 +22,9 @@ Always:
 - Guide customers through the process step by step
 """
 
-    stage_prompts = {
-        WorkflowStage.GREETING: """
+# Per-stage prompt bodies as named module constants; the table below is
+# built once at import so no call path ever re-allocates these strings
+_GREETING_PROMPT = """
 CURRENT STAGE: Greeting & Initial Contact
 
 Your goals:
@@ -30,9 +33,9 @@ Your goals:
 3. Request their business license number to begin verification
 
 Keep it conversational. Example: "Hello, you've reached Easy Inventory Rentals. How can I help you today?"
-""",
+"""
 
-        WorkflowStage.CUSTOMER_VERIFICATION: """
+_CUSTOMER_VERIFICATION_PROMPT = """
 CURRENT STAGE: Customer Verification
 
 Your goals:
@@ -43,9 +46,9 @@ Your goals:
 
 If verification succeeds, acknowledge their business name and move to inventory discovery.
 If verification fails, politely end the call.
-""",
+"""
 
-        WorkflowStage.EQUIPMENT_DISCOVERY: """
+_EQUIPMENT_DISCOVERY_PROMPT = """
 CURRENT STAGE: Inventory Discovery
 
 Your goals:
@@ -60,9 +63,9 @@ Available inventory context:
 
 Remember: Customers use natural language to describe their needs.
 Let the LLM match their needs to inventory categories naturally.
-""",
+"""
 
-        WorkflowStage.REQUIREMENTS_CONFIRMATION: """
+_REQUIREMENTS_CONFIRMATION_PROMPT = """
 CURRENT STAGE: Requirements Confirmation
 
 Your goals:
@@ -76,9 +79,9 @@ Selected Item:
 
 Required Certification: {cert_required}
 Specifications: {weight_class}
-""",
+"""
 
-        WorkflowStage.PRICING_NEGOTIATION: """
+_PRICING_NEGOTIATION_PROMPT = """
 CURRENT STAGE: Pricing Negotiation
 
 Your goals:
@@ -92,9 +95,9 @@ Negotiation attempts: {negotiation_attempts}/{max_attempts}
 
 If negotiation fails after {max_attempts} attempts, politely end the call.
 Be willing to adjust price for longer rentals or if they're close to your range.
-""",
+"""
 
-        WorkflowStage.OPERATOR_CERTIFICATION: """
+_OPERATOR_CERTIFICATION_PROMPT = """
 CURRENT STAGE: Operator Certification
 
 Your goals:
@@ -104,9 +107,9 @@ Your goals:
 4. Confirm verification result
 
 Be clear about the specific certification required.
-""",
+"""
 
-        WorkflowStage.INSURANCE_VERIFICATION: """
+_INSURANCE_VERIFICATION_PROMPT = """
 CURRENT STAGE: Insurance Verification
 
 Your goals:
@@ -116,9 +119,9 @@ Your goals:
 4. Confirm verification result
 
 This is a compliance requirement for item protection.
-""",
+"""
 
-        WorkflowStage.BOOKING_COMPLETION: """
+_BOOKING_COMPLETION_PROMPT = """
 CURRENT STAGE: Booking Completion
 
 Your goals:
@@ -135,13 +138,190 @@ Your goals:
 
 This is the final step - make sure customer has all information they need.
 """
-    }
-    
-    prompt = base_instructions + "\n" + stage_prompts.get(stage, "")
-    
-    # Replace context placeholders
+
+stage_prompts = {
+    WorkflowStage.GREETING: _GREETING_PROMPT,
+    WorkflowStage.CUSTOMER_VERIFICATION: _CUSTOMER_VERIFICATION_PROMPT,
+    WorkflowStage.EQUIPMENT_DISCOVERY: _EQUIPMENT_DISCOVERY_PROMPT,
+    WorkflowStage.REQUIREMENTS_CONFIRMATION: _REQUIREMENTS_CONFIRMATION_PROMPT,
+    WorkflowStage.PRICING_NEGOTIATION: _PRICING_NEGOTIATION_PROMPT,
+    WorkflowStage.OPERATOR_CERTIFICATION: _OPERATOR_CERTIFICATION_PROMPT,
+    WorkflowStage.INSURANCE_VERIFICATION: _INSURANCE_VERIFICATION_PROMPT,
+    WorkflowStage.BOOKING_COMPLETION: _BOOKING_COMPLETION_PROMPT,
+}
+
+
+static_prompt_preamble = """
+The call moves through the stages below in order. The active stage and its
+current values (selected item, rates, required certification, etc.) are
+delivered to you in separate [STAGE CONTEXT] messages as the call progresses -
+placeholders like {daily_rate} in the stage guidance refer to those values.
+Always follow the guidance for the stage named in the most recent
+[STAGE CONTEXT] message.
+"""
+
+
+# Base + stage joined once per stage at import; get_system_prompt then
+# serves a shared, byte-identical string unless placeholders need filling,
+# which keeps the prefix stable for provider prompt caches
+_STAGE_PROMPTS = {
+    stage: sys.intern(base_instructions + "\n" + body) for stage, body in stage_prompts.items()
+}
+_DEFAULT_PROMPT = sys.intern(base_instructions + "\n")
+
+# Full prompts as a tuple indexed by the IntEnum member itself - a tuple
+# subscript instead of a dict hash+eq on every lookup. Stages without
+# guidance (CALL_ENDED) fall back to the bare base instructions.
+_STAGE_TABLE = tuple(
+    _STAGE_PROMPTS.get(stage, _DEFAULT_PROMPT) for stage in WorkflowStage
+)
+assert len(_STAGE_TABLE) == len(WorkflowStage), "stage table out of sync with WorkflowStage"
+
+# Templates parsed once at import into (literal, key) render plans, so
+# filling placeholders is a single join with no brace re-parsing per
+# call. Stages whose templates have no placeholders get no plan and are
+# served as the shared string directly.
+_FORMATTER = string.Formatter()
+_STAGE_PLAN = {}
+for _stage, _template in _STAGE_PROMPTS.items():
+    _plan = [(literal, field) for literal, field, _spec, _conv in _FORMATTER.parse(_template)]
+    if any(field is not None for _, field in _plan):
+        _STAGE_PLAN[_stage] = _plan
+
+
+def _freeze_context(context: dict) -> tuple:
+    """Build a hashable, order-independent cache key from a context dict."""
+    return tuple(
+        (key, value if isinstance(value, (str, int, float, bool, type(None)))
+         else json.dumps(value, sort_keys=True, default=str))
+        for key, value in sorted(context.items())
+    )
+
+
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=256)
+def _render_system_prompt(stage: WorkflowStage, frozen_context: tuple) -> str:
+    """Render a stage prompt from its parse plan (memoized).
+
+    Substitution is safe in the string.Template sense: a placeholder the
+    caller didn't supply is left as-is instead of raising KeyError, so a
+    partially-populated context can't take down a turn.
+    """
+    plan = _STAGE_PLAN.get(stage) if frozen_context else None
+    if plan is None:
+        return _STAGE_TABLE[stage]
+
+    context = dict(frozen_context)
+    parts = []
+    for literal, key in plan:
+        if literal:
+            parts.append(literal)
+        if key is not None:
+            value = context.get(key, _MISSING)
+            parts.append('{' + key + '}' if value is _MISSING else str(value))
+    return "".join(parts)
+
+
+def get_system_prompt(stage: WorkflowStage, context: dict = None) -> str:
+    """Generate system prompt based on current workflow stage.
+
+    Rendered prompts are memoized per (stage, context) - within a call
+    session the same state recurs turn after turn, so repeat renders are
+    a cache hit and return the identical string object.
+    """
+    # Nothing to substitute: hand back the interned full prompt without
+    # paying for context freezing or the memo lookup
+    if not context or stage not in _STAGE_PLAN:
+        return _STAGE_TABLE[stage]
+    return _render_system_prompt(stage, _freeze_context(context))
+
+
+get_system_prompt.cache_clear = _render_system_prompt.cache_clear
+
+
+# Pre-encoded variants so callers that feed an HTTP body can skip the
+# per-call UTF-8 encode of the multi-kilobyte prompt text
+_STAGE_TABLE_BYTES = tuple(text.encode('utf-8') for text in _STAGE_TABLE)
+_STAGE_PLAN_BYTES = {
+    stage: [(literal.encode('utf-8'), key) for literal, key in plan]
+    for stage, plan in _STAGE_PLAN.items()
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _render_system_prompt_bytes(stage: WorkflowStage, frozen_context: tuple) -> bytes:
+    """Render a stage prompt straight to UTF-8 bytes (memoized)."""
+    plan = _STAGE_PLAN_BYTES.get(stage) if frozen_context else None
+    if plan is None:
+        return _STAGE_TABLE_BYTES[stage]
+
+    context = dict(frozen_context)
+    parts = []
+    for literal, key in plan:
+        if literal:
+            parts.append(literal)
+        if key is not None:
+            value = context.get(key, _MISSING)
+            parts.append(('{' + key + '}').encode('utf-8') if value is _MISSING
+                         else str(value).encode('utf-8'))
+    return b"".join(parts)
+
+
+def get_system_prompt_bytes(stage: WorkflowStage, context: dict = None) -> bytes:
+    """UTF-8 encoded counterpart of get_system_prompt.
+
+    The literal chunks are encoded once at import, so assembly is a
+    bytes join of pre-encoded pieces plus only the dynamic values.
+    """
+    if not context or stage not in _STAGE_PLAN_BYTES:
+        return _STAGE_TABLE_BYTES[stage]
+    return _render_system_prompt_bytes(stage, _freeze_context(context))
+
+
+get_system_prompt_bytes.cache_clear = _render_system_prompt_bytes.cache_clear
+
+
+# Assembled once at import - every call session shares the same string object
+_STATIC_SYSTEM_PROMPT = base_instructions + static_prompt_preamble + "\n".join(
+    stage_prompts[stage] for stage in stage_prompts
+)
+
+
+def get_static_system_prompt() -> str:
+    """
+    Get the stage-independent system prompt covering the whole workflow.
+
+    The prompt is byte-identical for the entire call; per-stage values are
+    injected as separate [STAGE CONTEXT] messages instead of being baked in,
+    so the Realtime API's prompt-prefix cache stays valid across stage
+    transitions.
+    """
+    return _STATIC_SYSTEM_PROMPT
+
+
+def format_stage_context(stage: WorkflowStage, context: dict = None) -> str:
+    """
+    Serialize stage context into a compact, deterministic message.
+
+    Keys are sorted so the same state always produces the same bytes,
+    keeping the conversation prefix stable for prompt caching.
+    """
+    parts = [f"STAGE={stage.name.lower()}"]
     if context:
-        prompt = prompt.format(**context)
-    
-    return prompt
+        parts.extend(f"{key}={context[key]}" for key in sorted(context))
+    return "[STAGE CONTEXT] " + "; ".join(parts)
+
+
+def get_dynamic_context(stage: WorkflowStage, context: dict = None) -> str:
+    """
+    Get the dynamic tail for a stage, to be sent as its own message.
+
+    Prompt content is split so the static part (get_static_system_prompt)
+    stays byte-identical for the whole call and keeps provider prompt
+    caches warm, while everything that varies - stage, rates, selected
+    item, attempt counts - travels in this trailing message.
+    """
+    return format_stage_context(stage, context)
 
@@ -1,124 +1,302 @@
 """Input validation utilities for rental agent."""
 
-import re
-from functools import wraps
+import string
+from functools import lru_cache, wraps
+from typing import Dict, Final, NoReturn
+
+# Whitelists as translate() delete tables built once at import:
+# translating away every allowed character leaves residue only when the
+# input contains something invalid. Pure C, no regex engine dispatch -
+# measurably faster than even a compiled pattern on these short inputs.
+# Final annotations let AOT compilers (mypyc/Cython) treat these as true
+# constants instead of re-resolving module globals per call.
+# License and policy numbers use the same alphanumeric-plus-dash
+# whitelist, so both validators share one table.
+_ALNUM_DASH_DELETE: Final[Dict[int, None]] = str.maketrans('', '', string.ascii_letters + string.digits + '-')
+_NAME_DELETE: Final[Dict[int, None]] = str.maketrans('', '', string.ascii_letters + string.whitespace + "-'")
+_PHONE_DELETE: Final[Dict[int, None]] = str.maketrans('', '', string.whitespace + '-().')
+
+__all__ = [
+    'ValidationError',
+    'validate_license_number',
+    'validate_equipment_id',
+    'validate_address',
+    'validate_price',
+    'validate_rental_days',
+    'validate_operator_name',
+    'validate_phone_number',
+    'validate_policy_number',
+    'validate_booking',
+    'validate_booking_fast',
+    'validate_cached',
+]
 
 
 class ValidationError(Exception):
     """Raised when input validation fails."""
-    pass
+    # No per-instance __dict__; these are raised constantly under
+    # malformed traffic and carry nothing beyond args
+    __slots__ = ()
+
+
+# Static-message failures reuse one instance instead of allocating per
+# raise; only their message is ever read. They must be raised through
+# _raise below so state from previous raises doesn't pile up on them.
+_ERR_EMPTY_LICENSE = ValidationError("License number cannot be empty")
+_ERR_SHORT_LICENSE = ValidationError("License number must be at least 5 characters")
+_ERR_LONG_LICENSE = ValidationError("License number is too long (max 50 characters)")
+_ERR_BAD_LICENSE = ValidationError("License number contains invalid characters")
+_ERR_EMPTY_EQUIPMENT_ID = ValidationError("Equipment ID cannot be empty")
+_ERR_LONG_EQUIPMENT_ID = ValidationError("Equipment ID is too long (max 20 characters)")
+_ERR_BAD_EQUIPMENT_ID = ValidationError("Equipment ID must follow format: 2-4 letters followed by 3-6 digits")
+_ERR_EMPTY_ADDRESS = ValidationError("Address cannot be empty")
+_ERR_SHORT_ADDRESS = ValidationError("Address seems too short (minimum 10 characters)")
+_ERR_LONG_ADDRESS = ValidationError("Address is too long (max 200 characters)")
+_ERR_PRICE_NOT_NUMBER = ValidationError("Price must be a number")
+_ERR_DAYS_NOT_INT = ValidationError("Rental days must be an integer")
+_ERR_DAYS_TOO_FEW = ValidationError("Rental duration must be at least 1 day")
+_ERR_DAYS_TOO_MANY = ValidationError("Rental duration cannot exceed 365 days")
+_ERR_EMPTY_NAME = ValidationError("Operator name cannot be empty")
+_ERR_SHORT_NAME = ValidationError("Operator name is too short")
+_ERR_LONG_NAME = ValidationError("Operator name is too long (max 100 characters)")
+_ERR_BAD_NAME = ValidationError("Operator name contains invalid characters")
+_ERR_EMPTY_PHONE = ValidationError("Phone number cannot be empty")
+_ERR_BAD_PHONE = ValidationError("Phone number must contain only digits and formatting characters")
+_ERR_SHORT_PHONE = ValidationError("Phone number is too short")
+_ERR_LONG_PHONE = ValidationError("Phone number is too long")
+_ERR_EMPTY_POLICY = ValidationError("Policy number cannot be empty")
+_ERR_SHORT_POLICY = ValidationError("Policy number is too short")
+_ERR_LONG_POLICY = ValidationError("Policy number is too long (max 50 characters)")
+_ERR_BAD_POLICY = ValidationError("Policy number contains invalid characters")
+
+
+def _raise(err: ValidationError) -> NoReturn:
+    """Raise a shared ValidationError without letting state accumulate.
+
+    A plain ``raise`` on a long-lived instance appends frames to its
+    ``__traceback__`` on every raise and, inside an except block, pins
+    the in-flight exception via ``__context__`` - both grow without
+    bound under sustained malformed traffic. Clearing them here keeps
+    the singletons stateless between raises.
+    """
+    err.__context__ = err.__cause__ = None
+    raise err.with_traceback(None)
 
 
 def validate_license_number(license_number: str) -> None:
     """Validate business license number format."""
     if not license_number:
-        raise ValidationError("License number cannot be empty")
+        _raise(_ERR_EMPTY_LICENSE)
 
     if len(license_number) < 5:
-        raise ValidationError("License number must be at least 5 characters")
+        _raise(_ERR_SHORT_LICENSE)
 
     if len(license_number) > 50:
-        raise ValidationError("License number is too long (max 50 characters)")
+        _raise(_ERR_LONG_LICENSE)
 
     # Basic alphanumeric check
-    if not re.match(r'^[A-Za-z0-9\-]+$', license_number):
-        raise ValidationError("License number contains invalid characters")
+    if license_number.translate(_ALNUM_DASH_DELETE):
+        _raise(_ERR_BAD_LICENSE)
 
 
 def validate_equipment_id(equipment_id: str) -> None:
     """Validate equipment ID format."""
     if not equipment_id:
-        raise ValidationError("Equipment ID cannot be empty")
+        _raise(_ERR_EMPTY_EQUIPMENT_ID)
 
     if len(equipment_id) > 20:
-        raise ValidationError("Equipment ID is too long (max 20 characters)")
+        _raise(_ERR_LONG_EQUIPMENT_ID)
 
-    # Check format (e.g., ITM001, EQ001)
-    if not re.match(r'^[A-Z]{2,4}\d{3,6}$', equipment_id):
-        raise ValidationError("Equipment ID must follow format: 2-4 letters followed by 3-6 digits")
+    # Check format (e.g., ITM001, EQ001): 2-4 uppercase letters then
+    # 3-6 digits, verified with str fast paths instead of a regex
+    prefix = equipment_id.rstrip(string.digits)
+    suffix = equipment_id[len(prefix):]
+    if not (equipment_id.isascii() and prefix.isalpha() and prefix.isupper()
+            and 2 <= len(prefix) <= 4 and 3 <= len(suffix) <= 6):
+        _raise(_ERR_BAD_EQUIPMENT_ID)
 
 
 def validate_address(address: str) -> None:
     """Validate address format."""
     if not address:
-        raise ValidationError("Address cannot be empty")
+        _raise(_ERR_EMPTY_ADDRESS)
 
     if len(address) < 10:
-        raise ValidationError("Address seems too short (minimum 10 characters)")
+        _raise(_ERR_SHORT_ADDRESS)
 
     if len(address) > 200:
-        raise ValidationError("Address is too long (max 200 characters)")
+        _raise(_ERR_LONG_ADDRESS)
+
+
+# Bound-violation messages built once per distinct bound; with the
+# default (0, 100000) bounds the failure path allocates nothing new
+@lru_cache(maxsize=64)
+def _low_price_msg(bound) -> str:
+    return f"Price cannot be less than ${bound}"
+
+
+@lru_cache(maxsize=64)
+def _high_price_msg(bound) -> str:
+    return f"Price cannot exceed ${bound}"
 
 
 def validate_price(price: float, min_value: float = 0, max_value: float = 100000) -> None:
     """Validate price values."""
-    if not isinstance(price, (int, float)):
-        raise ValidationError("Price must be a number")
+    # Exact type checks: cheaper than isinstance and deliberately
+    # rejects bool, which isinstance(x, int) would let through
+    t = type(price)
+    if t is not int and t is not float:
+        _raise(_ERR_PRICE_NOT_NUMBER)
 
     if price < min_value:
-        raise ValidationError(f"Price cannot be less than ${min_value}")
+        raise ValidationError(_low_price_msg(min_value))
 
     if price > max_value:
-        raise ValidationError(f"Price cannot exceed ${max_value}")
+        raise ValidationError(_high_price_msg(max_value))
 
 
 def validate_rental_days(days: int) -> None:
     """Validate rental duration."""
-    if not isinstance(days, int):
-        raise ValidationError("Rental days must be an integer")
+    # type(...) is int deliberately rejects bool (a subclass of int)
+    if type(days) is not int:
+        _raise(_ERR_DAYS_NOT_INT)
 
     if days < 1:
-        raise ValidationError("Rental duration must be at least 1 day")
+        _raise(_ERR_DAYS_TOO_FEW)
 
     if days > 365:
-        raise ValidationError("Rental duration cannot exceed 365 days")
+        _raise(_ERR_DAYS_TOO_MANY)
 
 
 def validate_operator_name(name: str) -> None:
     """Validate operator name."""
     if not name:
-        raise ValidationError("Operator name cannot be empty")
+        _raise(_ERR_EMPTY_NAME)
 
     if len(name) < 2:
-        raise ValidationError("Operator name is too short")
+        _raise(_ERR_SHORT_NAME)
 
     if len(name) > 100:
-        raise ValidationError("Operator name is too long (max 100 characters)")
+        _raise(_ERR_LONG_NAME)
 
     # Allow letters, spaces, hyphens, apostrophes
-    if not re.match(r"^[A-Za-z\s\-']+$", name):
-        raise ValidationError("Operator name contains invalid characters")
+    if name.translate(_NAME_DELETE):
+        _raise(_ERR_BAD_NAME)
 
 
 def validate_phone_number(phone: str) -> None:
     """Validate phone number format."""
     if not phone:
-        raise ValidationError("Phone number cannot be empty")
+        _raise(_ERR_EMPTY_PHONE)
 
     # Remove common formatting characters
-    cleaned = re.sub(r'[\s\-\(\)\.]', '', phone)
+    cleaned = phone.translate(_PHONE_DELETE)
 
     if not cleaned.isdigit():
-        raise ValidationError("Phone number must contain only digits and formatting characters")
+        _raise(_ERR_BAD_PHONE)
 
-    if len(cleaned) < 10:
-        raise ValidationError("Phone number is too short")
+    n = len(cleaned)
+    if n < 10:
+        _raise(_ERR_SHORT_PHONE)
 
-    if len(cleaned) > 15:
-        raise ValidationError("Phone number is too long")
+    if n > 15:
+        _raise(_ERR_LONG_PHONE)
 
 
 def validate_policy_number(policy_number: str) -> None:
     """Validate insurance policy number."""
     if not policy_number:
-        raise ValidationError("Policy number cannot be empty")
+        _raise(_ERR_EMPTY_POLICY)
 
     if len(policy_number) < 5:
-        raise ValidationError("Policy number is too short")
+        _raise(_ERR_SHORT_POLICY)
 
     if len(policy_number) > 50:
-        raise ValidationError("Policy number is too long (max 50 characters)")
+        _raise(_ERR_LONG_POLICY)
 
     # Alphanumeric with some special characters
-    if not re.match(r'^[A-Za-z0-9\-]+$', policy_number):
-        raise ValidationError("Policy number contains invalid characters")
+    if policy_number.translate(_ALNUM_DASH_DELETE):
+        _raise(_ERR_BAD_POLICY)
+
+
+# One entry per booking field, in the order the workflow collects them;
+# keys match the ConversationState attribute names
+_BOOKING_VALIDATORS = (
+    ('business_license', validate_license_number),
+    ('equipment_id', validate_equipment_id),
+    ('job_address', validate_address),
+    ('operator_name', validate_operator_name),
+    ('operator_license', validate_license_number),
+    ('operator_phone', validate_phone_number),
+    ('insurance_policy', validate_policy_number),
+)
+
+
+def validate_booking(payload: dict) -> None:
+    """Validate all booking fields in one pass.
+
+    Unlike calling the individual validators back-to-back, this collects
+    every failure and raises a single ValidationError listing all of
+    them, so the caller can surface the full correction list at once.
+    """
+    errors = []
+    for field, validator in _BOOKING_VALIDATORS:
+        try:
+            validator(payload.get(field))
+        except ValidationError as e:
+            errors.append(f"{field}: {e}")
+    if errors:
+        raise ValidationError("; ".join(errors))
+
+
+def validate_booking_fast(payload: dict) -> bool:
+    """Cheap yes/no form of validate_booking.
+
+    Bails on the first failure and skips error-message assembly.
+    """
+    try:
+        for field, validator in _BOOKING_VALIDATORS:
+            validator(payload.get(field))
+    except ValidationError:
+        return False
+    return True
+
+
+# String validators addressable by name for the memoized entry point
+_VALIDATORS = {
+    'license': validate_license_number,
+    'equipment_id': validate_equipment_id,
+    'address': validate_address,
+    'operator_name': validate_operator_name,
+    'phone': validate_phone_number,
+    'policy': validate_policy_number,
+}
+
+
+@lru_cache(maxsize=1024)
+def _validate_outcome(kind: str, value):
+    """Run a validator once per (kind, value), remembering the outcome.
+
+    The cached error is returned stripped of the traceback it picked up
+    during the original raise, so the cache holds bare instances rather
+    than frame chains.
+    """
+    try:
+        _VALIDATORS[kind](value)
+    except ValidationError as e:
+        return e.with_traceback(None)
+    return None
+
+
+def validate_cached(kind: str, value) -> None:
+    """Validate ``value`` as ``kind``, memoizing repeat checks.
+
+    Call flows re-validate the same license or equipment ID at several
+    stage transitions within one conversation; after the first check the
+    outcome - pass or the exact error - is served from a bounded cache.
+    """
+    error = _validate_outcome(kind, value)
+    if error is not None:
+        # Cached instances live for the cache's lifetime; raise through
+        # _raise so repeat failures don't stack tracebacks on them
+        _raise(error)